@@ -1,6 +1,7 @@
 """Module for Customer class"""
 import uuid
 import json
+from src.reservation import Reservation
 
 
 class CustomerException(Exception):
@@ -39,13 +40,23 @@ class Customer:
         self.name = name
         self._save()
 
-    def delete(self):
+    def delete(self, mode='restrict'):
         """
         Deletes the current customer from the DB
 
+        Reservations are looked up in the customer's reverse index file,
+        so the cost is proportional to the customer's bookings.
+
+        Args:
+            mode (str): 'restrict' refuses to delete a customer with
+                reservations, 'cascade' cancels them first
+
         Returns:
             None
         """
+        if mode not in ('restrict', 'cascade'):
+            raise CustomerException(f'Invalid delete mode: {mode}')
+
         with open(self.DB_PATH, 'r+', encoding='utf-8') as file:
             customers = json.load(file)
 
@@ -53,6 +64,12 @@ class Customer:
             if not exists:
                 raise CustomerException('Customer is not stored in db')
 
+            if Reservation.find_by_customer(self.id):
+                if mode == 'restrict':
+                    raise CustomerException('Customer has reservations, '
+                                            'cannot delete customer')
+                Reservation.cancel_by_customer(self.id)
+
             del customers[self.id]
             file.seek(0)
             json.dump(customers, file)
@@ -1,6 +1,7 @@
 """Module for Hotel class"""
 import uuid
 import json
+from itertools import islice
 from src.reservation import Reservation
 
 
@@ -10,6 +11,81 @@ class HotelException(Exception):
     """
 
 
+class HotelReservations:
+    """
+    Lazy view over the reservations of a hotel, streamed from the hotel
+    reservations file one page at a time and only when accessed
+    """
+    PAGE_SIZE = 100
+
+    def __init__(self, hotel_id, page_size=None):
+        self.hotel_id = hotel_id
+        self.page_size = page_size or self.PAGE_SIZE
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page
+
+    def __len__(self):
+        return sum(1 for _ in Reservation.read_lines(self.hotel_id))
+
+    def __contains__(self, room_number):
+        room_number = str(room_number)
+        return any(row['room_number'] == room_number
+                   for row in Reservation.read_hotel(self.hotel_id))
+
+    def pages(self):
+        """
+        Streams the reservations in pages, reading the file once; a
+        cancellation blanks its line in place, so an ongoing iteration
+        never repeats a room nor skips one that is still reserved
+
+        Returns:
+            generator: Lists of tuples of (room_number, reservation details)
+        """
+        lines = self._lines()
+        while True:
+            page = [self._decode(line)
+                    for line in islice(lines, self.page_size)]
+            if not page:
+                return
+            yield page
+
+    def page(self, number):
+        """
+        Fetches a page of reservations, decoding only the lines in it
+
+        Args:
+            number (int): The zero-based page number
+
+        Returns:
+            list: Tuples of (room_number, reservation details)
+        """
+        start = number * self.page_size
+        return [self._decode(line) for line in
+                islice(self._lines(), start, start + self.page_size)]
+
+    def _lines(self):
+        """
+        Private method to stream the raw lines of the reservations file
+
+        Returns:
+            generator: The encoded lines
+        """
+        return (line for _, line in Reservation.read_lines(self.hotel_id))
+
+    @staticmethod
+    def _decode(line):
+        """
+        Private method to decode a line of the reservations file
+
+        Returns:
+            tuple: The room number and the reservation details
+        """
+        row = json.loads(line)
+        return row['room_number'], {'customer_id': row['customer_id']}
+
+
 class Hotel:
     """Class for Hotel"""
     DB_PATH = 'hotels.json'
@@ -22,11 +98,24 @@ class Hotel:
                 raise HotelException('Hotel not found')
 
             self.name = existing_hotel.get('name')
+            # bring over bookings of earlier versions before the view reads
+            if 'reservations' in existing_hotel:
+                Reservation.migrate([self.id])
 
         else:
             self.id = str(uuid.uuid4())
             self.name = None
 
+    @property
+    def reservations(self):
+        """
+        Lazy, paged view of the hotel reservations
+
+        Returns:
+            HotelReservations: The reservations view
+        """
+        return HotelReservations(self.id)
+
     def create(self, name):
         """
         Stores the hotel in the DB
@@ -39,14 +128,24 @@ class Hotel:
         """
         self.modify_information(name)
 
-    def delete(self):
+    def delete(self, mode='restrict'):
         """
         Removes the current hotel from the DB
 
+        Args:
+            mode (str): 'restrict' refuses to delete a hotel with
+                reservations, 'cascade' drops them along with the hotel
+
         Returns:
             None
 
         """
+        if mode not in ('restrict', 'cascade'):
+            raise HotelException(f'Invalid delete mode: {mode}')
+
+        # bookings of earlier versions count as reservations too
+        Reservation.migrate([self.id])
+
         with open(self.DB_PATH, 'r+', encoding='utf-8') as file:
             hotels = json.load(file)
 
@@ -54,11 +153,18 @@ class Hotel:
             if not exists:
                 raise HotelException('Hotel is not stored in db')
 
+            if mode == 'restrict' and \
+                    Reservation.has_reservations(self.id):
+                raise HotelException('Hotel has reservations, '
+                                     'cannot delete hotel')
+
             del hotels[self.id]
             file.seek(0)
             json.dump(hotels, file)
             file.truncate()
 
+        Reservation.delete_hotel(self.id)
+
     def display_information(self):
         """
         Prints the information of the hotel
@@ -129,7 +235,7 @@ class Hotel:
             dict: Hotel details
 
         """
-        with open('hotels.json', encoding='utf-8') as file:
+        with open(self.DB_PATH, encoding='utf-8') as file:
             hotels = json.load(file)
             return hotels.get(self.id)
 
@@ -141,12 +247,12 @@ class Hotel:
             None
 
         """
-        with open('hotels.json', 'r+', encoding='utf-8') as file:
+        with open(self.DB_PATH, 'r+', encoding='utf-8') as file:
             hotels = json.load(file)
-            hotels[self.id] = {
-                'id': self.id,
-                'name': self.name
-            }
+            hotel = hotels.setdefault(self.id, {})
+            # keep reservations embedded by earlier versions until migrated
+            hotel['id'] = self.id
+            hotel['name'] = self.name
             file.seek(0)
             json.dump(hotels, file)
             file.truncate()
@@ -0,0 +1,503 @@
+"""
+Module to replay or generate a concurrent workload against the JSON storage
+and report throughput, latency and correctness violations
+
+Usage example:
+    python -m src.loadtest --workers 8 --mode processes --ops 2000
+    python -m src.loadtest --replay operations.jsonl --mode threads
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from json import JSONDecodeError
+
+from src.customer import Customer, CustomerException
+from src.hotel import Hotel
+from src.reservation import Reservation, ReservationException
+
+MODES = ('processes', 'threads')
+
+_LOCK = None
+
+
+class LoadTestException(Exception):
+    """
+    Custom exception for the load testing harness
+    """
+
+
+def use_storage(workdir):
+    """
+    Points the Hotel, Customer and Reservation classes to the JSON files
+    stored in a directory
+
+    Args:
+        workdir (str): The directory holding the JSON files
+
+    Returns:
+        dict: The previous paths, to be restored with restore_storage
+    """
+    previous = {
+        'hotels': Hotel.DB_PATH,
+        'customers': Customer.DB_PATH,
+        'reservations': Reservation.DB_PATH,
+        'reservation_hotels': Reservation.HOTELS_DB_PATH,
+        'reservation_customers': Reservation.CUSTOMERS_DB_PATH,
+        'index': Reservation.INDEX_PATH,
+    }
+    Hotel.DB_PATH = os.path.join(workdir, 'hotels.json')
+    Reservation.HOTELS_DB_PATH = Hotel.DB_PATH
+    Reservation.DB_PATH = os.path.join(workdir, 'reservations')
+    Customer.DB_PATH = os.path.join(workdir, 'customers.json')
+    Reservation.CUSTOMERS_DB_PATH = Customer.DB_PATH
+    Reservation.INDEX_PATH = os.path.join(workdir, 'reservations_index')
+    return previous
+
+
+def restore_storage(previous):
+    """
+    Restores the paths returned by use_storage
+
+    Args:
+        previous (dict): The previous paths
+
+    Returns:
+        None
+    """
+    Hotel.DB_PATH = previous['hotels']
+    Customer.DB_PATH = previous['customers']
+    Reservation.DB_PATH = previous['reservations']
+    Reservation.HOTELS_DB_PATH = previous['reservation_hotels']
+    Reservation.CUSTOMERS_DB_PATH = previous['reservation_customers']
+    Reservation.INDEX_PATH = previous['index']
+
+
+def seed(workdir, hotels, customers):
+    """
+    Creates empty JSON files in a directory and fills them with hotels
+    and customers
+
+    Args:
+        workdir (str): The directory holding the JSON files
+        hotels (int): The number of hotels to create
+        customers (int): The number of customers to create
+
+    Returns:
+        tuple: The lists of hotel ids and customer ids
+    """
+    os.makedirs(workdir, exist_ok=True)
+    for name in ('hotels.json', 'customers.json'):
+        with open(os.path.join(workdir, name), 'w', encoding='utf-8') as file:
+            file.write('{}')
+    for name in ('reservations', 'reservations_index'):
+        shutil.rmtree(os.path.join(workdir, name), ignore_errors=True)
+    # an empty store has an empty, already built, reverse index
+    os.makedirs(os.path.join(workdir, 'reservations_index'))
+
+    previous = use_storage(workdir)
+    try:
+        hotel_ids = []
+        for number in range(hotels):
+            hotel = Hotel()
+            hotel.create(f'Hotel {number}')
+            hotel_ids.append(hotel.id)
+
+        customer_ids = []
+        for number in range(customers):
+            customer = Customer()
+            customer.create(f'Customer {number}')
+            customer_ids.append(customer.id)
+    finally:
+        restore_storage(previous)
+
+    return hotel_ids, customer_ids
+
+
+def generate(hotel_ids, customer_ids, ops, rooms=50, skew=1.2,
+             read_ratio=0.3, rng=None):
+    """
+    Generates a synthetic operation log where hotels are picked following
+    a Zipf distribution, so the first hotels are the hot ones
+
+    Args:
+        hotel_ids (list): The hotel ids
+        customer_ids (list): The customer ids
+        ops (int): The number of operations
+        rooms (int): The number of rooms per hotel
+        skew (float): The Zipf exponent, 0 gives a uniform distribution
+        read_ratio (float): The share of customer lookups
+        rng (random.Random): The random generator
+
+    Returns:
+        list: The operations as dicts
+    """
+    rng = rng or random.Random()
+    weights = [1 / (rank ** skew) for rank in range(1, len(hotel_ids) + 1)]
+    operations = []
+    for _ in range(ops):
+        customer_id = rng.choice(customer_ids)
+        if rng.random() < read_ratio:
+            operations.append({'op': 'find_customer',
+                               'customer_id': customer_id})
+            continue
+        operations.append({
+            'op': 'reserve',
+            'hotel_id': rng.choices(hotel_ids, weights)[0],
+            'room_number': str(rng.randint(1, rooms)),
+            'customer_id': customer_id,
+        })
+    return operations
+
+
+def load_operations(path):
+    """
+    Reads a recorded operation log, one JSON operation per line
+
+    Args:
+        path (str): The JSONL file path
+
+    Returns:
+        list: The operations as dicts
+    """
+    operations = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            operation = json.loads(line)
+            if operation.get('op') not in ('reserve', 'find_customer'):
+                raise LoadTestException(
+                    f'Unknown operation: {operation.get("op")}'
+                )
+            operations.append(operation)
+    return operations
+
+
+def _init_worker(workdir, lock):
+    """
+    Private initializer run in every worker
+
+    Returns:
+        None
+    """
+    global _LOCK  # pylint: disable=global-statement
+    _LOCK = lock
+    use_storage(workdir)
+
+
+def _execute(operation):
+    """
+    Private method to execute a single operation
+
+    Returns:
+        None
+    """
+    if operation['op'] == 'find_customer':
+        Customer(operation['customer_id'])
+        return
+    Reservation(
+        operation['room_number'],
+        operation['hotel_id'],
+        operation['customer_id'],
+    ).create()
+
+
+def _is_booked(operation):
+    """
+    Private method to check whether the room of a reservation operation
+    is stored for its customer, skipping half-written lines
+
+    Returns:
+        bool: True if the booking persisted
+    """
+    for _, line in Reservation.read_lines(operation['hotel_id']):
+        try:
+            row = json.loads(line)
+        except JSONDecodeError:
+            continue
+        if row.get('room_number') == operation['room_number'] and \
+                row.get('customer_id') == operation['customer_id']:
+            return True
+    return False
+
+
+def _run_operation(operation, retries):
+    """
+    Private method to execute an operation, timing it and retrying it on
+    storage errors such as reading a half-written file
+
+    A reservation failing after its booking was stored, e.g. while
+    updating the reverse index, is recorded as 'partial' and not retried,
+    since a retry would only find its own booking and report a conflict.
+
+    Returns:
+        dict: The outcome, latency, lock wait and retries of the operation
+    """
+    result = {'operation': operation, 'lock_wait': 0.0, 'retries': 0}
+    start = time.perf_counter()
+    while True:
+        try:
+            if _LOCK is None:
+                _execute(operation)
+            else:
+                waiting = time.perf_counter()
+                with _LOCK:
+                    result['lock_wait'] += time.perf_counter() - waiting
+                    _execute(operation)
+            result['outcome'] = 'ok'
+        except ReservationException as error:
+            conflict = str(error) == 'Room is already reserved'
+            result['outcome'] = 'conflict' if conflict else 'error'
+            result['error'] = str(error)
+        except CustomerException as error:
+            result['outcome'] = 'error'
+            result['error'] = str(error)
+        except (JSONDecodeError, OSError) as error:
+            result['error'] = repr(error)
+            if operation['op'] == 'reserve' and _is_booked(operation):
+                result['outcome'] = 'partial'
+            elif result['retries'] < retries:
+                result['retries'] += 1
+                continue
+            else:
+                result['outcome'] = 'error'
+        break
+    result['latency'] = time.perf_counter() - start
+    return result
+
+
+def _run_batch(operations, retries):
+    """
+    Private method to execute a batch of operations in a worker
+
+    Returns:
+        list: The results of the operations
+    """
+    return [_run_operation(operation, retries) for operation in operations]
+
+
+def run(workdir, operations, workers=4, mode='threads', retries=3,
+        lock=False):
+    """
+    Executes the operations concurrently against the JSON files of a
+    directory and checks the final state
+
+    Args:
+        workdir (str): The directory holding the JSON files
+        operations (list): The operations to execute
+        workers (int): The number of processes or threads
+        mode (str): One of 'processes' or 'threads'
+        retries (int): The retries for an operation failing on storage
+        lock (bool): Serializes the operations with a shared lock
+
+    Returns:
+        dict: The load test report
+    """
+    if mode not in MODES:
+        raise LoadTestException(f'Invalid mode: {mode}')
+
+    batches = [operations[number::workers] for number in range(workers)]
+    previous = use_storage(workdir)
+    try:
+        start = time.perf_counter()
+        if mode == 'processes':
+            shared_lock = multiprocessing.Lock() if lock else None
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(workdir, shared_lock)) as pool:
+                results = list(pool.map(_run_batch, batches,
+                                        [retries] * workers))
+        else:
+            _init_worker(workdir, threading.Lock() if lock else None)
+            with ThreadPoolExecutor(workers) as pool:
+                results = list(pool.map(_run_batch, batches,
+                                        [retries] * workers))
+        elapsed = time.perf_counter() - start
+    finally:
+        _init_worker(workdir, None)
+        restore_storage(previous)
+
+    results = [result for batch in results for result in batch]
+    return _report(workdir, results, elapsed)
+
+
+def _percentile(values, percent):
+    """
+    Private method to compute a percentile with the nearest-rank method
+
+    Returns:
+        float: The percentile
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, int(round(percent / 100 * len(ordered))) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def _stored_rows():
+    """
+    Private method to read every stored reservation of the hotels in the
+    current storage
+
+    Returns:
+        tuple: A Counter of (customer_id, hotel_id, room_number) rows and
+            whether an unreadable line was found
+    """
+    with open(Hotel.DB_PATH, encoding='utf-8') as file:
+        hotels = json.load(file)
+
+    stored = Counter()
+    corrupted = False
+    for hotel_id in hotels:
+        for _, line in Reservation.read_lines(hotel_id):
+            try:
+                row = json.loads(line)
+                stored[(row['customer_id'], hotel_id,
+                        row['room_number'])] += 1
+            except (JSONDecodeError, KeyError):
+                # interleaved writes left the line unreadable
+                corrupted = True
+    return stored, corrupted
+
+
+def _report(workdir, results, elapsed):
+    """
+    Private method to aggregate the results and look for correctness
+    violations in the final state of the JSON files
+
+    Returns:
+        dict: The load test report
+    """
+    latencies = [result['latency'] for result in results]
+    outcomes = Counter(result['outcome'] for result in results)
+
+    booked = Counter(
+        (result['operation']['hotel_id'], result['operation']['room_number'])
+        for result in results
+        if result['operation']['op'] == 'reserve'
+        and result['outcome'] in ('ok', 'partial')
+    )
+
+    previous = use_storage(workdir)
+    try:
+        stored, corrupted = _stored_rows()
+        with open(Customer.DB_PATH, encoding='utf-8') as file:
+            customer_ids = set(json.load(file))
+        customer_ids.update(result['operation']['customer_id']
+                            for result in results)
+        indexed = {
+            (customer_id, hotel_id, room_number)
+            for customer_id in customer_ids
+            for hotel_id, room_number
+            in Reservation.find_by_customer(customer_id)
+        }
+    finally:
+        restore_storage(previous)
+
+    rooms = Counter((hotel_id, room_number)
+                    for _, hotel_id, room_number in stored.elements())
+    double_booked = sum(
+        1 for key in booked.keys() | rooms.keys()
+        if max(booked[key], rooms[key]) > 1
+    )
+    lost = sum(1 for key in booked if not rooms[key])
+    index_mismatches = len(set(stored) ^ indexed)
+
+    return {
+        'operations': len(results),
+        'elapsed': elapsed,
+        'throughput': len(results) / elapsed if elapsed else 0.0,
+        'latency_p50': _percentile(latencies, 50),
+        'latency_p95': _percentile(latencies, 95),
+        'latency_p99': _percentile(latencies, 99),
+        'latency_max': max(latencies, default=0.0),
+        'latency_mean': statistics.mean(latencies) if latencies else 0.0,
+        'lock_wait': sum(result['lock_wait'] for result in results),
+        'ok': outcomes['ok'],
+        'partial': outcomes['partial'],
+        'conflicts': outcomes['conflict'],
+        'errors': outcomes['error'],
+        'retries': sum(result['retries'] for result in results),
+        'double_booked_rooms': double_booked,
+        'lost_reservations': lost,
+        'index_mismatches': index_mismatches,
+        'corrupted_storage': corrupted,
+    }
+
+
+def display_report(report):
+    """
+    Prints the load test report
+
+    Args:
+        report (dict): The load test report
+
+    Returns:
+        None
+    """
+    print(
+        f'Operations: {report["operations"]} '
+        f'in {report["elapsed"]:.3f}s '
+        f'({report["throughput"]:.1f} ops/s)\n'
+        f'Latency p50/p95/p99/max (ms): '
+        f'{report["latency_p50"] * 1000:.2f} / '
+        f'{report["latency_p95"] * 1000:.2f} / '
+        f'{report["latency_p99"] * 1000:.2f} / '
+        f'{report["latency_max"] * 1000:.2f}\n'
+        f'Lock wait (s): {report["lock_wait"]:.3f}\n'
+        f'OK: {report["ok"]} Partial: {report["partial"]} '
+        f'Conflicts: {report["conflicts"]} '
+        f'Errors: {report["errors"]} Retries: {report["retries"]}\n'
+        f'Double-booked rooms: {report["double_booked_rooms"]} '
+        f'Lost reservations: {report["lost_reservations"]} '
+        f'Index mismatches: {report["index_mismatches"]} '
+        f'Corrupted storage: {report["corrupted_storage"]}\n'
+    )
+
+
+def main():
+    """Command line entry point for the load testing harness"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workdir', default='loadtest_db')
+    parser.add_argument('--mode', choices=MODES, default='threads')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=1000)
+    parser.add_argument('--hotels', type=int, default=10)
+    parser.add_argument('--customers', type=int, default=100)
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--skew', type=float, default=1.2)
+    parser.add_argument('--read-ratio', type=float, default=0.3)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--lock', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--replay', default=None,
+                        help='JSONL operation log to replay on a workdir '
+                             'already holding the referenced records')
+    args = parser.parse_args()
+
+    if args.replay:
+        operations = load_operations(args.replay)
+    else:
+        hotel_ids, customer_ids = seed(args.workdir, args.hotels,
+                                       args.customers)
+        operations = generate(hotel_ids, customer_ids, args.ops,
+                              rooms=args.rooms, skew=args.skew,
+                              read_ratio=args.read_ratio,
+                              rng=random.Random(args.seed))
+
+    report = run(args.workdir, operations, workers=args.workers,
+                 mode=args.mode, retries=args.retries, lock=args.lock)
+    display_report(report)
+
+
+if __name__ == '__main__':
+    main()
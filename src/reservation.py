@@ -1,5 +1,15 @@
 """Module for Reservation class"""
+import contextlib
 import json
+import os
+import shutil
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
 
 
 class ReservationException(Exception):
@@ -9,8 +19,23 @@ class ReservationException(Exception):
 
 
 class Reservation:
-    """Class for Reservation"""
-    DB_PATH = 'hotels.json'
+    """
+    Class for Reservation
+
+    Reservations are stored apart from the hotel metadata, one JSON Lines
+    file per hotel in DB_PATH, so loading a hotel never decodes them. A
+    cancelled reservation is blanked in place and vacuum compacts the files.
+
+    The reverse index keeps one file per customer in INDEX_PATH, mapping
+    hotel id -> room number -> byte offset of the reservation line, so a
+    customer's bookings are found and cancelled without scanning hotels.
+    """
+    DB_PATH = 'reservations'
+    HOTELS_DB_PATH = 'hotels.json'
+    CUSTOMERS_DB_PATH = 'customers.json'
+    INDEX_PATH = 'reservations_index'
+
+    _lock_state = threading.local()
 
     def __init__(self, room_number, hotel_id, customer_id):
         self.room_number = str(room_number)
@@ -23,22 +48,16 @@ class Reservation:
         Returns:
             None
         """
-        # check if the room is available
-        if self._find_reservation():
-            raise ReservationException('Room is already reserved')
-
-        # add reservation
-        with open('hotels.json', 'r+', encoding='utf-8') as file:
-            hotels = json.load(file)
-            if not hotels.get(self.hotel_id).get('reservations'):
-                hotels[self.hotel_id]['reservations'] = {}
+        with self._lock():
+            # check if the room is available
+            if self._find_reservation():
+                raise ReservationException('Room is already reserved')
 
-            hotels[self.hotel_id]['reservations'][self.room_number] = {
-                'customer_id': self.customer_id
-            }
-            file.seek(0)
-            json.dump(hotels, file)
-            file.truncate()
+            # add reservation
+            offset = self._append(self.hotel_id, self.room_number,
+                                  self.customer_id)
+            self._index_add(self.customer_id, self.hotel_id,
+                            self.room_number, offset)
 
     def cancel(self):
         """
@@ -47,9 +66,7 @@ class Reservation:
         Returns:
             None
         """
-        with open('hotels.json', 'r+', encoding='utf-8') as file:
-            hotels = json.load(file)
-
+        with self._lock():
             existing_reservation = self._find_reservation()
             if not existing_reservation:
                 raise ReservationException('Reservation not found')
@@ -58,10 +75,203 @@ class Reservation:
                 raise ReservationException('Customer ID does not match, '
                                            'cannot cancel reservation')
 
-            del hotels[self.hotel_id]['reservations'][self.room_number]
-            file.seek(0)
-            json.dump(hotels, file)
-            file.truncate()
+            self._blank(self.hotel_id, existing_reservation['offset'],
+                        self.room_number, self.customer_id)
+            self._index_remove(self.customer_id, self.hotel_id,
+                               self.room_number)
+
+    @classmethod
+    def hotel_path(cls, hotel_id):
+        """
+        Returns the path of the file storing the reservations of a hotel
+
+        Args:
+            hotel_id (str): The hotel id
+
+        Returns:
+            str: The file path
+        """
+        return os.path.join(cls.DB_PATH, f'{hotel_id}.jsonl')
+
+    @classmethod
+    def read_lines(cls, hotel_id):
+        """
+        Streams the raw lines of the reservations file of a hotel, skipping
+        blank lines and a trailing line that is still being written
+
+        Args:
+            hotel_id (str): The hotel id
+
+        Returns:
+            generator: Tuples of (byte offset, encoded line)
+        """
+        path = cls.hotel_path(hotel_id)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as file:
+            offset = 0
+            for line in file:
+                start = offset
+                offset += len(line)
+                if line.endswith(b'\n') and line.strip():
+                    yield start, line
+
+    @classmethod
+    def read_hotel(cls, hotel_id):
+        """
+        Streams the reservations of a hotel, one line at a time
+
+        Args:
+            hotel_id (str): The hotel id
+
+        Returns:
+            generator: Dicts with the room_number and customer_id
+        """
+        for _, line in cls.read_lines(hotel_id):
+            yield json.loads(line)
+
+    @classmethod
+    def has_reservations(cls, hotel_id):
+        """
+        Checks whether a hotel has any reservation, reading a single line
+
+        Args:
+            hotel_id (str): The hotel id
+
+        Returns:
+            bool: True if the hotel has reservations
+        """
+        return next(cls.read_lines(hotel_id), None) is not None
+
+    @classmethod
+    def find_by_customer(cls, customer_id):
+        """
+        Lists the reservations of a customer using the reverse index,
+        without scanning the hotels
+
+        Args:
+            customer_id (str): The customer id
+
+        Returns:
+            list: Tuples of (hotel_id, room_number)
+        """
+        return [
+            (hotel_id, room)
+            for hotel_id, rooms in cls._read_index(customer_id).items()
+            for room in rooms
+        ]
+
+    @classmethod
+    def cancel_by_customer(cls, customer_id):
+        """
+        Cancels every reservation of a customer by blanking the lines
+        recorded in their index file, in time proportional to their
+        bookings
+
+        Args:
+            customer_id (str): The customer id
+
+        Returns:
+            int: The number of cancelled reservations
+        """
+        with cls._lock():
+            entries = cls._read_index(customer_id)
+            embedded = [hotel_id for hotel_id, rooms in entries.items()
+                        if None in rooms.values()]
+            if embedded:
+                cls._migrate(embedded)
+                entries = cls._read_index(customer_id)
+
+            cancelled = 0
+            for hotel_id, rooms in entries.items():
+                for room, offset in rooms.items():
+                    if cls._blank(hotel_id, offset, room, customer_id):
+                        cancelled += 1
+
+            cls._write_index(customer_id, {})
+            return cancelled
+
+    @classmethod
+    def delete_hotel(cls, hotel_id):
+        """
+        Removes the reservations of a hotel along with their reverse
+        index entries
+
+        Args:
+            hotel_id (str): The hotel id
+
+        Returns:
+            None
+        """
+        with cls._lock():
+            customer_ids = {row['customer_id']
+                            for row in cls.read_hotel(hotel_id)}
+            for customer_id in customer_ids:
+                entries = cls._read_index(customer_id)
+                entries.pop(hotel_id, None)
+                cls._write_index(customer_id, entries)
+
+            path = cls.hotel_path(hotel_id)
+            if os.path.exists(path):
+                os.remove(path)
+
+    @classmethod
+    def migrate(cls, hotel_ids=None):
+        """
+        Moves the reservations embedded in the hotel records, as stored by
+        earlier versions, to the per-hotel files
+
+        Args:
+            hotel_ids (list): The hotels to migrate, all of them by default
+
+        Returns:
+            int: The number of migrated reservations
+        """
+        with cls._lock():
+            return cls._migrate(hotel_ids)
+
+    @classmethod
+    def vacuum(cls):
+        """
+        Removes reservations that reference missing customers or hotels,
+        compacts the cancelled lines and rebuilds the reverse index, in a
+        single streaming pass over each hotel file
+
+        Returns:
+            int: The number of orphan reservations removed
+        """
+        with cls._lock():
+            cls._migrate()
+            with open(cls.CUSTOMERS_DB_PATH, encoding='utf-8') as file:
+                customers = json.load(file)
+            with open(cls.HOTELS_DB_PATH, encoding='utf-8') as file:
+                hotels = json.load(file)
+
+            index = {}
+            removed = 0
+            for hotel_id in cls._stored_hotels():
+                if hotel_id not in hotels:
+                    removed += sum(1 for _ in cls.read_lines(hotel_id))
+                    os.remove(cls.hotel_path(hotel_id))
+                    continue
+
+                offset = 0
+                descriptor, tmp_path = tempfile.mkstemp(dir=cls.DB_PATH)
+                with os.fdopen(descriptor, 'wb') as file:
+                    for _, line in cls.read_lines(hotel_id):
+                        row = json.loads(line)
+                        if row['customer_id'] not in customers:
+                            removed += 1
+                            continue
+                        file.write(line)
+                        index.setdefault(row['customer_id'], {}) \
+                            .setdefault(hotel_id, {})[row['room_number']] = \
+                            offset
+                        offset += len(line)
+                os.replace(tmp_path, cls.hotel_path(hotel_id))
+
+            cls._install_index(index)
+            return removed
 
     def _find_reservation(self):
         """
@@ -71,17 +281,279 @@ class Reservation:
             dict: Reservation details
         """
 
-        with open('hotels.json', 'r+', encoding='utf-8') as file:
+        with open(self.HOTELS_DB_PATH, encoding='utf-8') as file:
             hotels = json.load(file)
 
-            existing_hotel = hotels.get(self.hotel_id)
-
-            if not existing_hotel:
+            hotel = hotels.get(self.hotel_id)
+            if not hotel:
                 raise ReservationException('Hotel not found')
 
-            reservations = existing_hotel.get('reservations')
+        # bring over bookings of earlier versions before looking for the room
+        if 'reservations' in hotel:
+            self._migrate([self.hotel_id])
+
+        for offset, line in self.read_lines(self.hotel_id):
+            row = json.loads(line)
+            if row['room_number'] == self.room_number:
+                return {'customer_id': row['customer_id'], 'offset': offset}
+
+        return None
 
-            if not reservations:
-                return None
+    @classmethod
+    @contextlib.contextmanager
+    def _lock(cls):
+        """
+        Private method to serialize writes to the reservations and the
+        reverse index across threads and processes, using a lock file;
+        nested calls in the same thread reuse the held lock
+
+        Returns:
+            contextmanager: The held lock
+        """
+        depth = getattr(cls._lock_state, 'depth', 0)
+        if depth or fcntl is None:
+            cls._lock_state.depth = depth + 1
+            try:
+                yield
+            finally:
+                cls._lock_state.depth = depth
+            return
+
+        os.makedirs(cls.DB_PATH, exist_ok=True)
+        with open(os.path.join(cls.DB_PATH, '.lock'), 'a',
+                  encoding='utf-8') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            cls._lock_state.depth = 1
+            try:
+                yield
+            finally:
+                cls._lock_state.depth = 0
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    @classmethod
+    def _append(cls, hotel_id, room_number, customer_id):
+        """
+        Private method to append a reservation line to a hotel file
+
+        Returns:
+            int: The byte offset of the line
+        """
+        os.makedirs(cls.DB_PATH, exist_ok=True)
+        with open(cls.hotel_path(hotel_id), 'ab') as file:
+            offset = file.seek(0, os.SEEK_END)
+            file.write(json.dumps({
+                'room_number': room_number,
+                'customer_id': customer_id
+            }).encode('utf-8') + b'\n')
+        return offset
+
+    @classmethod
+    def _blank(cls, hotel_id, offset, room_number, customer_id):
+        """
+        Private method to cancel a reservation by overwriting its line with
+        spaces, after checking the line at the offset is the expected one
+
+        Returns:
+            bool: True if the line was blanked
+        """
+        path = cls.hotel_path(hotel_id)
+        if offset is None or not os.path.exists(path):
+            return False
+        with open(path, 'r+b') as file:
+            file.seek(offset)
+            line = file.readline()
+            try:
+                row = json.loads(line)
+            except ValueError:
+                return False
+            if row.get('room_number') != room_number or \
+                    row.get('customer_id') != customer_id:
+                return False
+            file.seek(offset)
+            file.write(b' ' * (len(line) - 1))
+        return True
+
+    @classmethod
+    def _stored_hotels(cls):
+        """
+        Private method to list the hotels that have a reservations file
+
+        Returns:
+            list: The hotel ids
+        """
+        if not os.path.isdir(cls.DB_PATH):
+            return []
+        return [
+            name[:-len('.jsonl')] for name in os.listdir(cls.DB_PATH)
+            if name.endswith('.jsonl')
+        ]
+
+    @classmethod
+    def _migrate(cls, hotel_ids=None):
+        """
+        Private method to move reservations embedded in the hotel records
+        to the per-hotel files, the lock must be held
+
+        Returns:
+            int: The number of migrated reservations
+        """
+        # build the index first, so it sees the embedded maps only once
+        cls._ensure_index()
+        with open(cls.HOTELS_DB_PATH, 'r+', encoding='utf-8') as file:
+            hotels = json.load(file)
+            embedded = {
+                hotel_id: hotel.pop('reservations')
+                for hotel_id, hotel in hotels.items()
+                if 'reservations' in hotel
+                and (hotel_ids is None or hotel_id in hotel_ids)
+            }
+            if not embedded:
+                return 0
+
+            for hotel_id, reservations in embedded.items():
+                for room, reservation in reservations.items():
+                    customer_id = reservation.get('customer_id')
+                    offset = cls._append(hotel_id, room, customer_id)
+                    cls._index_add(customer_id, hotel_id, room, offset)
+
+            file.seek(0)
+            json.dump(hotels, file)
+            file.truncate()
+            return sum(len(reservations)
+                       for reservations in embedded.values())
+
+    @classmethod
+    def _index_add(cls, customer_id, hotel_id, room_number, offset):
+        """
+        Private method to register a reservation in the customer index
+
+        Returns:
+            None
+        """
+        entries = cls._read_index(customer_id)
+        entries.setdefault(hotel_id, {})[room_number] = offset
+        cls._write_index(customer_id, entries)
+
+    @classmethod
+    def _index_remove(cls, customer_id, hotel_id, room_number):
+        """
+        Private method to remove a reservation from the customer index
+
+        Returns:
+            None
+        """
+        entries = cls._read_index(customer_id)
+        rooms = entries.get(hotel_id, {})
+        rooms.pop(room_number, None)
+        if not rooms:
+            entries.pop(hotel_id, None)
+        cls._write_index(customer_id, entries)
+
+    @classmethod
+    def _index_path(cls, customer_id):
+        """
+        Private method to get the index file of a customer
+
+        Returns:
+            str: The file path
+        """
+        return os.path.join(cls.INDEX_PATH, f'{customer_id}.json')
+
+    @classmethod
+    def _read_index(cls, customer_id):
+        """
+        Private method to read the index entries of a customer
+
+        Returns:
+            dict: Byte offsets by hotel id and room number
+        """
+        cls._ensure_index()
+        path = cls._index_path(customer_id)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+
+    @classmethod
+    def _write_index(cls, customer_id, entries):
+        """
+        Private method to replace the index file of a customer atomically,
+        removing it when the customer has no reservations left
+
+        Returns:
+            None
+        """
+        path = cls._index_path(customer_id)
+        if not entries:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        descriptor, tmp_path = tempfile.mkstemp(dir=cls.INDEX_PATH)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _ensure_index(cls):
+        """
+        Private method to build the reverse index the first time it is
+        used, e.g. on data stored before the index existed
+
+        Returns:
+            None
+        """
+        if os.path.isdir(cls.INDEX_PATH):
+            return
+        with cls._lock():
+            if not os.path.isdir(cls.INDEX_PATH):
+                cls._install_index(cls._build_index())
+
+    @classmethod
+    def _build_index(cls):
+        """
+        Private method to build the reverse index from the reservations
+        stored for every hotel, including the ones still embedded in the
+        hotel records, without migrating them
+
+        Returns:
+            dict: Index entries by customer id
+        """
+        index = {}
+        for hotel_id in cls._stored_hotels():
+            for offset, line in cls.read_lines(hotel_id):
+                row = json.loads(line)
+                index.setdefault(row['customer_id'], {}) \
+                    .setdefault(hotel_id, {})[row['room_number']] = offset
+
+        with open(cls.HOTELS_DB_PATH, encoding='utf-8') as file:
+            hotels = json.load(file)
+        for hotel_id, hotel in hotels.items():
+            for room, reservation in (hotel.get('reservations') or {}).items():
+                index.setdefault(reservation.get('customer_id'), {}) \
+                    .setdefault(hotel_id, {}).setdefault(room, None)
+        return index
+
+    @classmethod
+    def _install_index(cls, index):
+        """
+        Private method to replace the whole reverse index, writing it to a
+        new directory first, the lock must be held
+
+        Returns:
+            None
+        """
+        parent = os.path.dirname(os.path.abspath(cls.INDEX_PATH))
+        tmp_dir = tempfile.mkdtemp(dir=parent)
+        for customer_id, entries in index.items():
+            path = os.path.join(tmp_dir, f'{customer_id}.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(entries, file)
 
-            return reservations.get(self.room_number, None)
+        if os.path.isdir(cls.INDEX_PATH):
+            old_dir = tempfile.mkdtemp(dir=parent)
+            os.rmdir(old_dir)
+            os.rename(cls.INDEX_PATH, old_dir)
+            os.rename(tmp_dir, cls.INDEX_PATH)
+            shutil.rmtree(old_dir)
+        else:
+            os.rename(tmp_dir, cls.INDEX_PATH)
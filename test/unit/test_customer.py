@@ -1,9 +1,12 @@
 """Tests for Customer class functionality"""
 import io
 import json
+import shutil
 import unittest
 import unittest.mock
 from src.customer import Customer, CustomerException
+from src.hotel import Hotel
+from src.reservation import Reservation
 
 
 class TestCustomer(unittest.TestCase):
@@ -11,15 +14,22 @@ class TestCustomer(unittest.TestCase):
     def setUp(self):
         self.customer = Customer()
         self.db_path = 'customers.json'
+        self.hotels_db_path = 'hotels.json'
 
-        # cleanup the file before the test
-        with open(self.db_path, 'w', encoding='utf-8') as file:
-            file.write('{}')
+        # cleanup the files before the test
+        for path in (self.db_path, self.hotels_db_path):
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('{}')
+        for path in (Reservation.DB_PATH, Reservation.INDEX_PATH):
+            shutil.rmtree(path, ignore_errors=True)
 
     def tearDown(self):
-        """Cleanup the file after the test"""
-        with open(self.db_path, 'w', encoding='utf-8') as file:
-            file.write('{}')
+        """Cleanup the files after the test"""
+        for path in (self.db_path, self.hotels_db_path):
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('{}')
+        for path in (Reservation.DB_PATH, Reservation.INDEX_PATH):
+            shutil.rmtree(path, ignore_errors=True)
 
     def test_customer_gets_created(self):
         """Test that a customer gets created and persisted in file"""
@@ -87,3 +97,52 @@ class TestCustomer(unittest.TestCase):
         """Test that deleting a non-existing customer raises an exception"""
         with self.assertRaises(CustomerException):
             self.customer.delete()
+
+    def test_customer_with_reservations_delete_restricted(self):
+        """
+        Test that deleting a customer with reservations raises an
+        exception by default.
+        """
+        self.customer.create('Moises Diaz')
+        hotel = Hotel()
+        hotel.create('Hilton')
+        hotel.reserve_room('101', self.customer)
+
+        with self.assertRaises(CustomerException):
+            self.customer.delete()
+
+    def test_customer_delete_restricted_without_index(self):
+        """
+        Test that reservations stored before the reverse index existed
+        still restrict deleting the customer.
+        """
+        self.customer.create('Moises Diaz')
+        hotel = Hotel()
+        hotel.create('Hilton')
+
+        with open(self.hotels_db_path, 'r+', encoding='utf-8') as file:
+            hotels = json.load(file)
+            hotels[hotel.id]['reservations'] = {
+                '101': {'customer_id': self.customer.id}
+            }
+            file.seek(0)
+            json.dump(hotels, file)
+            file.truncate()
+
+        with self.assertRaises(CustomerException):
+            self.customer.delete()
+
+    def test_customer_delete_cascades_to_reservations(self):
+        """
+        Test that deleting a customer in cascade mode removes
+        their reservations.
+        """
+        self.customer.create('Moises Diaz')
+        hotel = Hotel()
+        hotel.create('Hilton')
+        hotel.reserve_room('101', self.customer)
+
+        self.customer.delete(mode='cascade')
+
+        self.assertEqual(list(hotel.reservations), [])
+        self.assertEqual(Reservation.find_by_customer(self.customer.id), [])
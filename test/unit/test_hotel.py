@@ -1,11 +1,12 @@
 """ Unit tests for the Hotel class """
 import io
 import json
+import shutil
 import unittest
 import unittest.mock
 from src.hotel import Hotel, HotelException
 from src.customer import Customer
-from src.reservation import ReservationException
+from src.reservation import Reservation, ReservationException
 
 
 class TestHotel(unittest.TestCase):
@@ -15,14 +16,18 @@ class TestHotel(unittest.TestCase):
         self.hotel = Hotel()
         self.db_path = 'hotels.json'
 
-        # cleanup the file before the test
+        # cleanup the files before the test
         with open(self.db_path, 'w', encoding='utf-8') as file:
             file.write('{}')
+        for path in (Reservation.DB_PATH, Reservation.INDEX_PATH):
+            shutil.rmtree(path, ignore_errors=True)
 
     def tearDown(self):
-        """Cleanup the file after the test"""
+        """Cleanup the files after the test"""
         with open(self.db_path, 'w', encoding='utf-8') as file:
             file.write('{}')
+        for path in (Reservation.DB_PATH, Reservation.INDEX_PATH):
+            shutil.rmtree(path, ignore_errors=True)
 
     def test_hotel_gets_created(self):
         """ Test that a hotel gets created and persisted in file"""
@@ -84,15 +89,15 @@ class TestHotel(unittest.TestCase):
 
         self.hotel.reserve_room('101', customer)
 
+        self.assertEqual(
+            list(self.hotel.reservations),
+            [('101', {'customer_id': customer.id})]
+        )
+
         with open(self.db_path, encoding='utf-8') as file:
             hotels = json.load(file)
-            reservations = hotels.get(self.hotel.id).get('reservations')
 
-        self.assertIsNotNone(reservations)
-        self.assertEqual(
-            reservations.get('101').get('customer_id'),
-            customer.id
-        )
+        self.assertNotIn('reservations', hotels.get(self.hotel.id))
 
     def test_hotel_cancels_reservation(self):
         """
@@ -107,11 +112,7 @@ class TestHotel(unittest.TestCase):
         self.hotel.reserve_room('101', customer)
         self.hotel.cancel_reservation('101', customer)
 
-        with open(self.db_path, encoding='utf-8') as file:
-            hotels = json.load(file)
-            reservations = hotels.get(self.hotel.id).get('reservations')
-
-        self.assertEqual(reservations, {})
+        self.assertEqual(list(self.hotel.reservations), [])
 
     def test_hotel_cancels_reservation_with_wrong_customer(self):
         """
@@ -144,6 +145,75 @@ class TestHotel(unittest.TestCase):
         with self.assertRaises(ReservationException):
             self.hotel.cancel_reservation('101', customer)
 
+    def test_hotel_modify_keeps_reservations(self):
+        """
+        Test that renaming a hotel does not drop its reservations.
+        """
+        self.hotel.create('Hilton')
+
+        customer = Customer()
+        customer.create('Moises Diaz')
+
+        self.hotel.reserve_room('101', customer)
+        self.hotel.modify_information('Fiesta Americana')
+
+        self.assertIn('101', self.hotel.reservations)
+
+    def test_hotel_reservations_are_paged(self):
+        """
+        Test that the reservations view reads the hotel reservations
+        from the db in pages.
+        """
+        self.hotel.create('Hilton')
+
+        customer = Customer()
+        customer.create('Moises Diaz')
+
+        for room in ('101', '102', '103'):
+            self.hotel.reserve_room(room, customer)
+
+        hotel = Hotel(self.hotel.id)
+        reservations = hotel.reservations
+        reservations.page_size = 2
+
+        self.assertEqual(len(reservations), 3)
+        self.assertIn('102', reservations)
+        self.assertEqual([room for room, _ in reservations.page(1)], ['103'])
+        self.assertEqual(
+            [room for room, _ in reservations],
+            ['101', '102', '103']
+        )
+
+    def test_hotel_reservations_iteration_with_cancellation(self):
+        """
+        Test that cancelling a reservation while iterating the view
+        neither repeats rooms nor skips the ones still reserved.
+        """
+        self.hotel.create('Hilton')
+
+        customer = Customer()
+        customer.create('Moises Diaz')
+
+        for room in ('101', '102', '103'):
+            self.hotel.reserve_room(room, customer)
+
+        reservations = self.hotel.reservations
+        reservations.page_size = 1
+
+        rooms = []
+        for room, _ in reservations:
+            if room == '101':
+                self.hotel.cancel_reservation('102', customer)
+            rooms.append(room)
+
+        self.assertEqual(len(rooms), len(set(rooms)))
+        self.assertEqual([room for room in rooms if room != '102'],
+                         ['101', '103'])
+        self.assertEqual(
+            [room for room, _ in self.hotel.reservations],
+            ['101', '103']
+        )
+
     def test_hotel_found_by_id(self):
         """
         Test that a hotel is found by using its id given that it
@@ -170,3 +240,57 @@ class TestHotel(unittest.TestCase):
         """
         with self.assertRaises(HotelException):
             self.hotel.delete()
+
+    def test_hotel_with_reservations_delete_restricted(self):
+        """
+        Test that deleting a hotel with reservations raises an
+        exception by default.
+        """
+        self.hotel.create('Hilton')
+
+        customer = Customer()
+        customer.create('Moises Diaz')
+
+        self.hotel.reserve_room('101', customer)
+
+        with self.assertRaises(HotelException):
+            self.hotel.delete()
+
+    def test_hotel_delete_cascades_to_index(self):
+        """
+        Test that deleting a hotel in cascade mode removes its
+        reservations from the reverse index.
+        """
+        self.hotel.create('Hilton')
+
+        customer = Customer()
+        customer.create('Moises Diaz')
+
+        self.hotel.reserve_room('101', customer)
+        self.hotel.delete(mode='cascade')
+
+        self.assertEqual(Reservation.find_by_customer(customer.id), [])
+
+    def test_hotel_with_embedded_reservations_delete_restricted(self):
+        """
+        Test that reservations embedded in the hotel record by an earlier
+        version restrict deleting the hotel.
+        """
+        self.hotel.create('Hilton')
+
+        customer = Customer()
+        customer.create('Moises Diaz')
+
+        with open(self.db_path, 'r+', encoding='utf-8') as file:
+            hotels = json.load(file)
+            hotels[self.hotel.id]['reservations'] = {
+                '101': {'customer_id': customer.id}
+            }
+            file.seek(0)
+            json.dump(hotels, file)
+            file.truncate()
+
+        with self.assertRaises(HotelException):
+            self.hotel.delete()
+
+        self.assertIn('101', self.hotel.reservations)
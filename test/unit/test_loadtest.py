@@ -0,0 +1,147 @@
+"""Test suite for the load testing harness"""
+import os
+import random
+import tempfile
+import unittest
+import unittest.mock
+from collections import Counter
+from json import JSONDecodeError
+from src import loadtest
+from src.hotel import Hotel
+from src.loadtest import LoadTestException
+from src.reservation import Reservation
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test suite for the load testing harness"""
+
+    def setUp(self):
+        """Creates a temporary directory with seeded JSON files"""
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.workdir = self.tmpdir.name
+        self.hotel_ids, self.customer_ids = loadtest.seed(
+            self.workdir, hotels=3, customers=5
+        )
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmpdir.cleanup()
+
+    def test_seed_does_not_touch_default_storage(self):
+        """
+        Test that seeding restores the default storage paths.
+        """
+        self.assertEqual(Hotel.DB_PATH, 'hotels.json')
+        self.assertTrue(
+            os.path.exists(os.path.join(self.workdir, 'hotels.json'))
+        )
+
+    def test_generate_skews_towards_first_hotel(self):
+        """
+        Test that the synthetic workload picks the first hotel
+        most often.
+        """
+        operations = loadtest.generate(
+            self.hotel_ids, self.customer_ids, 500,
+            skew=2, read_ratio=0, rng=random.Random(1)
+        )
+        hotels = Counter(operation['hotel_id'] for operation in operations)
+
+        self.assertEqual(hotels.most_common(1)[0][0], self.hotel_ids[0])
+
+    def test_locked_run_has_no_violations(self):
+        """
+        Test that a run serialized with a lock books every room once
+        and reports no correctness violations.
+        """
+        operations = loadtest.generate(
+            self.hotel_ids, self.customer_ids, 60,
+            rooms=5, rng=random.Random(1)
+        )
+        report = loadtest.run(self.workdir, operations, workers=3,
+                              mode='threads', lock=True)
+
+        self.assertEqual(report['operations'], 60)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['double_booked_rooms'], 0)
+        self.assertEqual(report['lost_reservations'], 0)
+        self.assertEqual(report['index_mismatches'], 0)
+        self.assertFalse(report['corrupted_storage'])
+        self.assertGreater(report['conflicts'], 0)
+
+    def test_invalid_mode_raises_exception(self):
+        """
+        Test that an unknown concurrency mode raises an exception.
+        """
+        with self.assertRaises(LoadTestException):
+            loadtest.run(self.workdir, [], mode='fibers')
+
+    def test_unknown_replayed_operation_raises_exception(self):
+        """
+        Test that replaying an unknown operation raises an exception.
+        """
+        path = os.path.join(self.workdir, 'operations.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('{"op": "drop_hotel"}\n')
+
+        with self.assertRaises(LoadTestException):
+            loadtest.load_operations(path)
+
+    def test_failure_after_booking_is_partial(self):
+        """
+        Test that a reservation failing after its booking was stored
+        is recorded as partial and not retried into a conflict.
+        """
+        operation = {
+            'op': 'reserve',
+            'hotel_id': self.hotel_ids[0],
+            'room_number': '101',
+            'customer_id': self.customer_ids[0],
+        }
+        previous = loadtest.use_storage(self.workdir)
+        try:
+            with unittest.mock.patch.object(
+                Reservation, '_index_add',
+                side_effect=JSONDecodeError('torn', '', 0)
+            ):
+                result = loadtest._run_operation(  # pylint: disable=W0212
+                    operation, retries=3
+                )
+        finally:
+            loadtest.restore_storage(previous)
+
+        self.assertEqual(result['outcome'], 'partial')
+        self.assertEqual(result['retries'], 0)
+
+    def test_unexpected_errors_are_not_retried(self):
+        """
+        Test that errors other than storage errors propagate instead
+        of being retried.
+        """
+        operation = {'op': 'find_customer', 'customer_id': 'missing'}
+        with unittest.mock.patch.object(
+            loadtest, '_execute', side_effect=AttributeError('bug')
+        ):
+            with self.assertRaises(AttributeError):
+                loadtest._run_operation(  # pylint: disable=W0212
+                    operation, retries=3
+                )
+
+    def test_index_divergence_is_reported(self):
+        """
+        Test that bookings missing from the reverse index are reported
+        as index mismatches.
+        """
+        operations = loadtest.generate(
+            self.hotel_ids, self.customer_ids, 10,
+            read_ratio=0, rng=random.Random(1)
+        )
+        with unittest.mock.patch.object(
+            Reservation, '_index_add',
+            side_effect=JSONDecodeError('torn', '', 0)
+        ):
+            report = loadtest.run(self.workdir, operations, workers=2,
+                                  mode='threads')
+
+        self.assertGreater(report['partial'], 0)
+        self.assertEqual(report['index_mismatches'], report['partial'])
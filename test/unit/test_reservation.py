@@ -1,6 +1,10 @@
 """Test suite for Reservation"""
+import json
+import os
+import shutil
+import threading
 import unittest
-from src.reservation import Reservation
+from src.reservation import Reservation, ReservationException
 from src.hotel import Hotel
 from src.customer import Customer
 
@@ -26,6 +30,8 @@ class TestReservation(unittest.TestCase):
             file.write('{}')
         with open(self.customers_db_path, 'w', encoding='utf-8') as file:
             file.write('{}')
+        for path in (Reservation.DB_PATH, Reservation.INDEX_PATH):
+            shutil.rmtree(path, ignore_errors=True)
 
         self.hotel = Hotel()
         self.hotel.create("Hilton")
@@ -40,6 +46,9 @@ class TestReservation(unittest.TestCase):
         with open(self.customers_db_path, 'w', encoding='utf-8') as file:
             file.write('{}')
 
+        for path in (Reservation.DB_PATH, Reservation.INDEX_PATH):
+            shutil.rmtree(path, ignore_errors=True)
+
     def test_room_already_reserved_raises_exception(self):
         """
         Test that reserving a room that is already reserved
@@ -63,3 +72,161 @@ class TestReservation(unittest.TestCase):
                 self.customer.id
             )
             reservation.create()
+
+    def test_reservation_gets_indexed_by_customer(self):
+        """
+        Test that creating and cancelling a reservation keeps the
+        reverse index in sync.
+        """
+        self.hotel.reserve_room('101', self.customer)
+        self.assertEqual(
+            Reservation.find_by_customer(self.customer.id),
+            [(self.hotel.id, '101')]
+        )
+
+        self.hotel.cancel_reservation('101', self.customer)
+        self.assertEqual(Reservation.find_by_customer(self.customer.id), [])
+
+    def test_vacuum_removes_orphan_reservations(self):
+        """
+        Test that vacuum removes reservations of missing customers
+        and rebuilds the reverse index.
+        """
+        self.hotel.reserve_room('101', self.customer)
+        orphan = Reservation('102', self.hotel.id, 'missing-customer')
+        orphan.create()
+
+        shutil.rmtree(Reservation.INDEX_PATH)
+
+        self.assertEqual(Reservation.vacuum(), 1)
+
+        self.assertEqual(
+            [room for room, _ in self.hotel.reservations],
+            ['101']
+        )
+        self.assertEqual(
+            Reservation.find_by_customer(self.customer.id),
+            [(self.hotel.id, '101')]
+        )
+
+    def test_vacuum_migrates_embedded_reservations(self):
+        """
+        Test that vacuum moves reservations embedded in the hotel
+        records out of the hotels file.
+        """
+        self._embed_reservation('101', self.customer.id)
+
+        self.assertEqual(Reservation.vacuum(), 0)
+
+        with open(self.hotels_db_path, encoding='utf-8') as file:
+            hotels = json.load(file)
+
+        self.assertNotIn('reservations', hotels.get(self.hotel.id))
+        self.assertEqual(
+            list(self.hotel.reservations),
+            [('101', {'customer_id': self.customer.id})]
+        )
+
+    def test_embedded_reservation_blocks_new_booking(self):
+        """
+        Test that a room booked by an earlier version, still embedded in
+        the hotel record, cannot be reserved again.
+        """
+        self._embed_reservation('101', self.customer.id)
+
+        other = Customer()
+        other.create('Moises Diaz Jr.')
+
+        with self.assertRaises(ReservationException):
+            Reservation('101', self.hotel.id, other.id).create()
+
+        self.assertEqual(
+            list(self.hotel.reservations),
+            [('101', {'customer_id': self.customer.id})]
+        )
+
+    def test_embedded_reservations_visible_when_loading_hotel(self):
+        """
+        Test that the reservations view of a loaded hotel includes the
+        bookings embedded by an earlier version.
+        """
+        self._embed_reservation('101', self.customer.id)
+
+        reservations = Hotel(self.hotel.id).reservations
+
+        self.assertEqual(len(reservations), 1)
+        self.assertIn('101', reservations)
+
+    def _embed_reservation(self, room, customer_id):
+        """Stores a reservation inside the hotel record, as done before"""
+        with open(self.hotels_db_path, 'r+', encoding='utf-8') as file:
+            hotels = json.load(file)
+            hotels[self.hotel.id]['reservations'] = {
+                room: {'customer_id': customer_id}
+            }
+            file.seek(0)
+            json.dump(hotels, file)
+            file.truncate()
+
+    def test_cancel_by_customer_blanks_only_their_lines(self):
+        """
+        Test that cancelling the reservations of a customer leaves the
+        lines of other customers where they are.
+        """
+        other = Customer()
+        other.create('Moises Diaz Jr.')
+
+        self.hotel.reserve_room('101', self.customer)
+        self.hotel.reserve_room('102', other)
+        path = Reservation.hotel_path(self.hotel.id)
+        size = os.path.getsize(path)
+        other_lines = list(Reservation.read_lines(self.hotel.id))[1:]
+
+        self.assertEqual(Reservation.cancel_by_customer(self.customer.id), 1)
+
+        self.assertEqual(os.path.getsize(path), size)
+        self.assertEqual(list(Reservation.read_lines(self.hotel.id)),
+                         other_lines)
+        self.assertEqual(Reservation.find_by_customer(self.customer.id), [])
+
+    def test_concurrent_reservations_keep_index_complete(self):
+        """
+        Test that reservations created from several threads are all
+        recorded in the reverse index.
+        """
+        def reserve(rooms):
+            for room in rooms:
+                Reservation(room, self.hotel.id, self.customer.id).create()
+
+        threads = [
+            threading.Thread(target=reserve,
+                             args=([f'{worker}{room}' for room in range(10)],))
+            for worker in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.hotel.reservations), 40)
+        self.assertEqual(
+            len(Reservation.find_by_customer(self.customer.id)), 40
+        )
+
+    def test_vacuum_compacts_cancelled_lines(self):
+        """
+        Test that vacuum drops cancelled lines and records offsets that
+        later cancellations can use.
+        """
+        self.hotel.reserve_room('101', self.customer)
+        self.hotel.reserve_room('102', self.customer)
+        self.hotel.cancel_reservation('101', self.customer)
+
+        self.assertEqual(Reservation.vacuum(), 0)
+
+        with open(Reservation.hotel_path(self.hotel.id),
+                  encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 1)
+
+        self.assertEqual(Reservation.cancel_by_customer(self.customer.id), 1)
+        self.assertEqual(list(self.hotel.reservations), [])